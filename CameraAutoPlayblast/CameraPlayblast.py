@@ -1,29 +1,76 @@
 from typing import Union
 
-from PySide2.QtWidgets import QLabel, QLineEdit, QPushButton, QListWidget
-from shiboken2 import wrapInstance
+from PySide2.QtWidgets import QLabel, QLineEdit, QPushButton, QListWidget, QCheckBox, QComboBox
+import concurrent.futures
+import functools
 import os
+import pathlib
+import queue
+import shutil
+import subprocess
 import sys
+import tempfile
+import threading
+import traceback
 import maya.cmds as cm
 import maya.OpenMaya as oM
-import maya.OpenMayaUI as oMUI
 from PySide2 import QtWidgets, QtCore, QtGui
 
+# Maya's default cameras, never offered for playblast
+_EXCLUDE_CAMS = frozenset(("topShape", "frontShape", "sideShape", "perspShape"))
+
+# Playblast resolutions offered in the UI, as (label, percent of 1920x1080).
+# The reduced sizes render and encode much faster and are meant for review passes only.
+PLAYBLAST_RESOLUTIONS = (
+    ("1920x1080 (100%)", 100),
+    ("960x540 (50%)", 50),
+    ("480x270 (25%)", 25),
+)
+
+# ffmpeg executable used to encode the playblast image sequences
+FFMPEG = os.environ.get("CAP_FFMPEG", "ffmpeg")
+
 
 class CameraPlayBlast(QtWidgets.QWidget):
     """
     A custom widget for handling camera playblasts in Maya.
     """
     playblast_btn: Union[QPushButton, QPushButton]
+    cancel_btn: Union[QPushButton, QPushButton]
+    parallel_cb: Union[QCheckBox, QCheckBox]
+    stream_cb: Union[QCheckBox, QCheckBox]
+    resolution_cmb: Union[QComboBox, QComboBox]
+    resolution_lb: Union[QLabel, QLabel]
     connection_lwg: Union[QListWidget, QListWidget]
     show_btn: Union[QPushButton, QPushButton]
     select_file_path_btn: Union[QPushButton, QPushButton]
     file_path_le: Union[QLineEdit, QLineEdit]
     file_path_lb: Union[QLabel, QLabel]
 
+    # ffmpeg H.264 encoder arguments, NVENC on NVIDIA GPUs and libx264 as the fallback
+    NVENC_CODEC = ("-c:v", "h264_nvenc", "-preset", "p4", "-rc", "vbr", "-cq", "19")
+    X264_CODEC = ("-c:v", "libx264", "-preset", "medium", "-crf", "19")
+
     def __init__(self):
         super(CameraPlayBlast, self).__init__()
 
+        # Listed cameras, {transform_name: (shape_name, file_name)}, filled by show_connections
+        self._cam_map = {}
+
+        # Set by the cancel button, checked between cameras
+        self._abort = False
+
+        # Coalesce rapid list selection changes into a single Maya selection update
+        self._sel_timer = QtCore.QTimer(self)
+        self._sel_timer.setSingleShot(True)
+        self._sel_timer.setInterval(50)
+        self._sel_timer.timeout.connect(self._apply_selection)
+
+        # Encode finished image sequences in the background while Maya renders the next camera
+        self._encode_q = queue.Queue(maxsize=2)
+        self._encode_errors = queue.Queue()
+        threading.Thread(target=self._encode_worker, daemon=True).start()
+
         self.create_widgets()
         self.create_layouts()
         self.create_connections()
@@ -50,36 +97,92 @@ class CameraPlayBlast(QtWidgets.QWidget):
         self.connection_lwg = QtWidgets.QListWidget()
         self.connection_lwg.setSelectionMode(QtWidgets.QListWidget.MultiSelection)  # Allow multi-selection
 
+        # Label and combo box to choose the playblast resolution
+        self.resolution_lb = QtWidgets.QLabel("Resolution:")
+        self.resolution_cmb = QtWidgets.QComboBox()
+        self.resolution_cmb.addItems([label for label, _ in PLAYBLAST_RESOLUTIONS])
+        self.resolution_cmb.setToolTip("Reduced resolutions are faster previews, for review only")
+
+        # Checkbox to render each camera in its own headless Hardware 2.0 batch render
+        self.parallel_cb = QtWidgets.QCheckBox("Parallel (batch render)")
+        self.parallel_cb.setToolTip(
+            "Render each camera with Maya Hardware 2.0 in a separate background process. "
+            "Viewport ornaments such as the HUD are not included."
+        )
+
+        # Checkbox to pipe the viewport frames straight into ffmpeg without temporary images
+        self.stream_cb = QtWidgets.QCheckBox("Stream to ffmpeg")
+        self.stream_cb.setToolTip("Encode the viewport frames directly, skipping the temporary image sequence")
+
         # Button to execute playblast
         self.playblast_btn = QtWidgets.QPushButton("Playblast")
 
+        # Button to stop a running playblast after the current camera
+        self.cancel_btn = QtWidgets.QPushButton("Cancel")
+        self.cancel_btn.setEnabled(False)
+
     def create_layouts(self):
         file_option_layout = QtWidgets.QGridLayout()
         file_option_layout.addWidget(self.file_path_lb, 0, 0)
         file_option_layout.addWidget(self.file_path_le, 0, 1)
         file_option_layout.addWidget(self.select_file_path_btn, 0, 2)
+        file_option_layout.addWidget(self.resolution_lb, 1, 0)
+        file_option_layout.addWidget(self.resolution_cmb, 1, 1, 1, 2)
+
+        option_layout = QtWidgets.QHBoxLayout()
+        option_layout.addWidget(self.parallel_cb)
+        option_layout.addWidget(self.stream_cb)
 
         button_down_layout = QtWidgets.QHBoxLayout()
         button_down_layout.addWidget(self.show_btn)
         button_down_layout.addWidget(self.playblast_btn)
+        button_down_layout.addWidget(self.cancel_btn)
 
         main_layout = QtWidgets.QVBoxLayout(self)
         main_layout.addLayout(file_option_layout)
         main_layout.addWidget(self.connection_lwg)
+        main_layout.addLayout(option_layout)
         main_layout.addLayout(button_down_layout)
 
     def create_connections(self):
         self.select_file_path_btn.clicked.connect(self.show_file_select_dialog)
-        self.connection_lwg.itemSelectionChanged.connect(self.current_selected)
+        self.connection_lwg.itemSelectionChanged.connect(self._sel_timer.start)
         self.show_btn.clicked.connect(self.show_connections)
         self.playblast_btn.clicked.connect(self.playblast)
+        self.cancel_btn.clicked.connect(lambda: setattr(self, "_abort", True))
+        self.parallel_cb.toggled.connect(self.update_stream_option)
+        self.resolution_cmb.currentIndexChanged.connect(self.update_stream_option)
+        self.update_stream_option()
+
+    def update_stream_option(self) -> None:
+        """
+        Only offer streaming when it can work: batch renders never stream, and streaming reads an
+        on-screen editor of exactly the output size, which must fit on the screen with its title bar.
+        """
+        width, height = self.get_resolution(PLAYBLAST_RESOLUTIONS[self.resolution_cmb.currentIndex()][1])
+        available = QtWidgets.QApplication.primaryScreen().availableSize()
+        title_bar = 40
+        fits = width <= available.width() and height + title_bar <= available.height()
+
+        self.stream_cb.setEnabled(fits and not self.parallel_cb.isChecked())
+        if fits:
+            self.stream_cb.setToolTip("Encode the viewport frames directly, skipping the temporary image sequence")
+        else:
+            self.stream_cb.setToolTip("This resolution doesn't fit on screen, pick a smaller one to stream")
 
     def show_file_select_dialog(self):
         """
-        Show a dialog to allow the user to select a directory.
+        Show a dialog to allow the user to select a directory, starting from the current or last used one.
         """
-        file_path = QtWidgets.QFileDialog.getExistingDirectory(self, "Select Directory")
-        self.file_path_le.setText(file_path)
+        settings = QtCore.QSettings("CameraAutoPlayblast", "CameraPlayblast")
+        start_dir = self.file_path_le.text() or settings.value("last_dir", "", str)
+        file_path = QtWidgets.QFileDialog.getExistingDirectory(
+            self, "Select Directory", start_dir,
+            QtWidgets.QFileDialog.ShowDirsOnly | QtWidgets.QFileDialog.DontResolveSymlinks
+        )
+        if file_path:
+            settings.setValue("last_dir", file_path)
+            self.file_path_le.setText(file_path)
 
     def validate_and_get_filepath(self) -> str:
         """
@@ -87,23 +190,30 @@ class CameraPlayBlast(QtWidgets.QWidget):
         Returns:
             A valid normalized file path, or an empty string if validation fails.
         """
-        filepath = os.path.normpath(self.file_path_le.text())
-        if not os.path.isdir(filepath):
+        text = self.file_path_le.text().strip()
+        if not text:
+            self.display_error("File path is empty. Please provide a valid path.")
+            return ""
+
+        filepath = pathlib.Path(text).expanduser()
+        if not filepath.is_dir():
             self.display_error("File path doesn't exist. Please provide a valid path.")
             return ""
-        return filepath
+        # absolute() rather than resolve(), so symlinks and mapped drives are kept as entered
+        return str(filepath.absolute())
 
     @staticmethod
-    def ensure_directory(path: str) -> str:
+    def ensure_directory(path: Union[str, pathlib.Path]) -> str:
         """
         Ensure the provided directory exists, and create it if necessary.
         Args:
-            path: The directory path.
+            path: The directory path, already absolute.
         Returns:
-            The absolute directory path.
+            The directory path.
         """
-        os.makedirs(path, exist_ok=True)
-        return os.path.abspath(path)
+        path = pathlib.Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        return str(path)
 
     @staticmethod
     def display_error(message: str) -> None:
@@ -114,13 +224,41 @@ class CameraPlayBlast(QtWidgets.QWidget):
         """
         oM.MGlobal.displayError(message)
 
+    @staticmethod
+    def format_error(error: Exception) -> str:
+        """
+        Describe an error, including the captured stderr of a failed subprocess.
+        Args:
+            error: The error to describe.
+        Returns:
+            The error description.
+        """
+        stderr = getattr(error, "stderr", None)
+        if stderr:
+            return f"{error}\n{stderr.decode(errors='replace').strip()}"
+        return str(error)
+
+    @classmethod
+    def display_exception(cls, message: str, error: Exception) -> None:
+        """
+        Display a failure with its error description, plus the full traceback when CAP_DEBUG is set.
+        Must be called from the except block handling the error.
+        Args:
+            message: What failed.
+            error: The error being handled.
+        """
+        cls.display_error(f"{message}: {cls.format_error(error)}")
+        if os.environ.get("CAP_DEBUG"):
+            oM.MGlobal.displayError(traceback.format_exc())
+
     def get_scene_shot_name(self) -> str:
         """
         Get the name of the current Maya scene file (sans extension).
         Returns:
             The scene name, or an empty string if it fails.
         """
-        shot_name = cm.file(query=True, sceneName=True, shortName=True).split(".")[0]
+        scene_name = cm.file(query=True, sceneName=True, shortName=True) or ""
+        shot_name = os.path.splitext(os.path.basename(scene_name))[0]
         if not shot_name:
             self.display_error("Scene name is missing. Please save the file and retry.")
             return ""
@@ -130,15 +268,29 @@ class CameraPlayBlast(QtWidgets.QWidget):
         """
         Populate the list widget with all cameras in the scene, excluding system cameras.
         """
+        cam_map = {}
+
+        # Walk the camera shapes in the DAG and read their parent transforms directly
+        dag_it = oM.MItDag(oM.MItDag.kDepthFirst, oM.MFn.kCamera)
+        while not dag_it.isDone():
+            dag_path = oM.MDagPath()
+            dag_it.getPath(dag_path)
+            shape_name = dag_path.partialPathName()
+            if shape_name.rpartition(":")[2] not in _EXCLUDE_CAMS:  # Handle namespace-separated cameras
+                transform_fn = oM.MFnDagNode(dag_path.transform())
+                file_name = transform_fn.name().rpartition(":")[2]
+                cam_map[transform_fn.partialPathName()] = (shape_name, file_name)
+            dag_it.next()
+        self._cam_map = cam_map
+        transform_names = list(cam_map)
+
+        # Repopulate the list in one batch without emitting a signal or repaint per item
+        self.connection_lwg.blockSignals(True)
+        self.connection_lwg.setUpdatesEnabled(False)
         self.connection_lwg.clear()
-        cameras = cm.ls(type="camera")
-        exclude_list = ["topShape", "frontShape", "sideShape", "perspShape"]
-
-        for cam in cameras:
-            cam_name = cam.split(":")[-1]  # Handle namespace-separated cameras
-            if cam_name not in exclude_list:
-                transform_node = cam.replace("Shape", "")
-                self.connection_lwg.addItem(QtWidgets.QListWidgetItem(transform_node))
+        self.connection_lwg.addItems(transform_names)
+        self.connection_lwg.setUpdatesEnabled(True)
+        self.connection_lwg.blockSignals(False)
         cm.select(clear=True)
 
     def playblast(self) -> None:
@@ -153,71 +305,494 @@ class CameraPlayBlast(QtWidgets.QWidget):
         if not shot_name:
             return
 
-        playblast_dir = self.ensure_directory(os.path.join(filepath, shot_name))
+        playblast_dir = self.ensure_directory(pathlib.Path(filepath, shot_name))
 
         selected_cameras = self.get_selected_cameras()
         if not selected_cameras:
             return
 
-        for camera in selected_cameras:
-            self.perform_playblast(camera, playblast_dir)
+        percent = PLAYBLAST_RESOLUTIONS[self.resolution_cmb.currentIndex()][1]
+
+        # Keep the UI responsive between cameras so the batch can be cancelled, without allowing re-entry
+        self._abort = False
+        self.playblast_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(True)
+        try:
+            if self.parallel_cb.isChecked():
+                self.run_parallel_playblast(selected_cameras, playblast_dir, percent)
+            else:
+                self.run_local_playblast(selected_cameras, playblast_dir, percent)
+        finally:
+            self.playblast_btn.setEnabled(True)
+            self.cancel_btn.setEnabled(False)
+
+    def run_parallel_playblast(self, cameras: list, playblast_dir: str, percent: int) -> None:
+        """
+        Batch render the cameras in background processes from a temporary copy of the scene.
+        Args:
+            cameras: (shape_name, file_name) pairs of the cameras.
+            playblast_dir: The directory path where the playblasts will be saved.
+            percent: The playblast resolution in percent of Full HD.
+        """
+        try:
+            scene_path = self.save_batch_scene()
+        except (OSError, RuntimeError) as e:
+            self.display_exception("Failed to save the scene for the batch render", e)
+            return
+
+        try:
+            self.playblast_parallel(cameras, playblast_dir, scene_path, percent)
+        finally:
+            try:
+                os.remove(scene_path)
+            except OSError:
+                pass
+
+    def run_local_playblast(self, cameras: list, playblast_dir: str, percent: int) -> None:
+        """
+        Playblast the cameras one after another in this Maya session.
+        Args:
+            cameras: (shape_name, file_name) pairs of the cameras.
+            playblast_dir: The directory path where the playblasts will be saved.
+            percent: The playblast resolution in percent of Full HD.
+        """
+        stream = self.stream_cb.isEnabled() and self.stream_cb.isChecked()
+        window, panel = self.create_playblast_panel(*self.get_resolution(percent))
+        try:
+            for shape, file_name in cameras:
+                if self._abort:
+                    break
+                self.perform_playblast(shape, file_name, playblast_dir, panel, percent, stream)
+                QtWidgets.QApplication.processEvents()
+        finally:
+            cm.deleteUI(panel, panel=True)
+            cm.deleteUI(window, window=True)
+
+            # Wait for the last encodes to drain and report their failures from the main thread,
+            # even when the loop was interrupted, so they never leak into the next run
+            self._encode_q.join()
+            while not self._encode_errors.empty():
+                self.display_error(self._encode_errors.get())
+        cm.refresh(force=True)
+
+    @staticmethod
+    def create_playblast_panel(width: int, height: int) -> tuple:
+        """
+        Create a dedicated model panel for the playblasts, set up once for every camera so the
+        user's viewports are never rebound and Viewport 2.0 state is shared between cameras.
+        The panel copies the display settings of the active model editor.
+        Args:
+            width: The editor width, matching the output so streamed frames need no scaling.
+            height: The editor height.
+        Returns:
+            A (window, panel) tuple, to be deleted once the playblasts are done.
+        """
+        import maya.mel as mel
+
+        active_editor = cm.playblast(activeEditor=True)
+        window = cm.window(title="Camera Playblast", widthHeight=(width, height))
+        cm.paneLayout()
+        panel = cm.modelPanel(label="CAP", menuBarVisible=False)
+        # Hide the icon bar so the editor itself fills the requested size
+        cm.layout(cm.modelPanel(panel, query=True, barLayout=True), edit=True, visible=False)
+        cm.showWindow(window)
+        # Show the same object types as the user's viewport, image planes and plugin shapes included
+        if active_editor and cm.modelEditor(active_editor, exists=True):
+            state = cm.modelEditor(active_editor, query=True, stateString=True)
+            mel.eval(f'string $editorName = "{panel}"; {state}')
+        cm.modelEditor(panel, edit=True, rendererName="vp2Renderer", displayTextures=True)
+        return window, panel
+
+    @staticmethod
+    def save_batch_scene() -> str:
+        """
+        Export the current scene once to a temporary file the batch workers can open.
+        The copy sits next to the original scene so relative texture and reference paths still resolve,
+        or in the system temp directory when the scene's directory isn't writable.
+        The user's scene file and its modified state are left untouched.
+        Returns:
+            The path of the exported scene.
+        """
+        scene_name = cm.file(query=True, sceneName=True)
+        scene_type = cm.file(query=True, type=True)[0]
+        scene_dir, scene_base = os.path.split(scene_name)
+        suffix = os.path.splitext(scene_base)[1]
+        try:
+            handle, scene_path = tempfile.mkstemp(prefix=".cap_", suffix=suffix, dir=scene_dir)
+        except OSError:
+            handle, scene_path = tempfile.mkstemp(prefix=".cap_", suffix=suffix)
+        os.close(handle)
+
+        try:
+            cm.file(scene_path, exportAll=True, preserveReferences=True, type=scene_type, force=True)
+        except RuntimeError:
+            os.remove(scene_path)
+            raise
+        return scene_path
+
+    @staticmethod
+    def get_render_executable() -> str:
+        """
+        Get the command line renderer shipped with the running Maya.
+        Returns:
+            The path to the Render executable.
+        """
+        executable = "Render.exe" if sys.platform == "win32" else "Render"
+        return os.path.join(os.environ["MAYA_LOCATION"], "bin", executable)
+
+    def playblast_parallel(self, cameras: list, playblast_dir: str, scene_path: str, percent: int = 100,
+                           workers: int = None) -> None:
+        """
+        Render the cameras concurrently, one headless Hardware 2.0 batch render per camera.
+        cm.playblast needs an interactive viewport, which batch processes do not have.
+        Args:
+            cameras: (shape_name, file_name) pairs of the cameras.
+            playblast_dir: The directory path where the playblasts will be saved.
+            scene_path: A saved copy of the scene for the workers to open.
+            percent: The playblast resolution in percent of Full HD.
+            workers: Maximum number of concurrent processes, defaults to the CPU count.
+        """
+        workers = min(workers or os.cpu_count() or 1, len(cameras))
+        render = self.get_render_executable()
+        project = cm.workspace(query=True, rootDirectory=True)
+        render_layer = cm.editRenderLayerGlobals(query=True, currentRenderLayer=True)  # What the viewport shows
+
+        # Each worker only waits on its subprocess, so threads are enough to keep the processes busy
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            start_frame, fps = self.get_frame_settings()
+            end_frame = int(cm.playbackOptions(query=True, maxTime=True))
+            futures = {}
+            for camera, file_name in cameras:
+                playblast_path = os.path.join(playblast_dir, f"{file_name}.mov")
+                future = executor.submit(
+                    self.run_batch_playblast, render, scene_path, project, camera, render_layer, playblast_path,
+                    percent, (start_frame, end_frame), fps
+                )
+                futures[future] = camera
+
+            # Poll the workers so the UI, and the cancel button, stay responsive while every worker is busy
+            pending = set(futures)
+            while pending:
+                done, pending = concurrent.futures.wait(
+                    pending, timeout=0.1, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                QtWidgets.QApplication.processEvents()
+                if self._abort:
+                    # Drop the cameras that have not started, the running processes still finish
+                    for future in pending:
+                        future.cancel()
+
+                for future in done:
+                    if future.cancelled():
+                        continue
+                    try:
+                        future.result()
+                    except (OSError, subprocess.CalledProcessError) as e:
+                        self.display_exception(f"Failed to create playblast for {futures[future]}", e)
+
+    @classmethod
+    def run_batch_playblast(cls, render: str, scene_path: str, project: str, camera: str, render_layer: str,
+                            playblast_path: str, percent: int, frame_range: tuple, fps: float) -> None:
+        """
+        Render a camera with Hardware 2.0 in a headless batch process, then encode the frames into a movie.
+        Args:
+            render: The path to the Render executable.
+            scene_path: A saved copy of the scene to render.
+            project: The Maya project the scene paths are relative to.
+            camera: The camera name.
+            render_layer: The only render layer to render.
+            playblast_path: Full path of the output playblast file.
+            percent: The playblast resolution in percent of Full HD.
+            frame_range: The (start_frame, end_frame) to render.
+            fps: The frame rate of the movie.
+        """
+        width, height = cls.get_resolution(percent)
+        start_frame, end_frame = frame_range
+        image_dir = tempfile.mkdtemp(prefix="cap_")
+        stem = pathlib.Path(playblast_path).stem
+        command = [
+            render, "-r", "hw2",
+            "-proj", project,
+            "-cam", camera,
+            "-rl", render_layer,
+            "-s", str(start_frame),
+            "-e", str(end_frame),
+            "-x", str(width),
+            "-y", str(height),
+            "-rd", image_dir,
+            "-im", stem,
+            "-of", "png",
+            "-fnc", "name.#.ext",
+            "-pad", "4",
+            scene_path
+        ]
+        try:
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+            # Maya may still nest the frames in a render layer folder, so look for where they landed
+            frames = sorted(pathlib.Path(image_dir).rglob(f"{stem}.*.png"))
+            frame_dir = frames[0].parent if frames else image_dir
+            cls.encode_movie(cls.get_image_prefix(frame_dir, playblast_path), playblast_path, start_frame, fps)
+        finally:
+            shutil.rmtree(image_dir, ignore_errors=True)
 
     def get_selected_cameras(self) -> list:
         """
-        Get the cameras currently selected in the scene.
+        Get the cameras currently selected in the list widget.
         Returns:
-            A list of camera names, or an empty list if no cameras are selected.
+            A list of (shape_name, file_name) pairs, or an empty list if no cameras are selected.
         """
-        selected_cameras = cm.ls(selection=True, type="camera")
+        selected_cameras = [self._cam_map[item.text()] for item in self.connection_lwg.selectedItems()]
         if not selected_cameras:
             self.display_error("No camera selected for the playblast. Please select a camera.")
             return []
         return selected_cameras
 
-    def perform_playblast(self, camera: str, playblast_dir: str) -> None:
+    def perform_playblast(self, camera: str, file_name: str, playblast_dir: str, panel: str, percent: int = 100,
+                          stream: bool = False) -> None:
         """
         Perform the playblast for a specific camera.
         Args:
-            camera: The camera name.
+            camera: The camera shape name.
+            file_name: The playblast file name, without extension.
             playblast_dir: The directory path where the playblast will be saved.
+            panel: The model panel to playblast from.
+            percent: The playblast resolution in percent of Full HD.
+            stream: Pipe the frames straight into ffmpeg instead of going through an image sequence.
         """
-        cm.lookThru(camera)
-        playblast_path = os.path.join(playblast_dir, f"{camera.split(':')[-1]}.mov")
+        cm.modelPanel(panel, edit=True, camera=camera)
+        playblast_path = os.path.join(playblast_dir, f"{file_name}.mov")
         try:
-            self.execute_playblast(playblast_path)
-        except Exception as e:
-            self.display_error(f"Failed to create playblast for {camera}: {e}")
+            if stream:
+                self.stream_playblast(playblast_path, panel, percent)
+            else:
+                self.execute_playblast(playblast_path, panel, percent)
+        except (RuntimeError, OSError, subprocess.CalledProcessError) as e:
+            self.display_exception(f"Failed to create playblast for {camera}", e)
 
     @staticmethod
-    def execute_playblast(playblast_path: str) -> None:
+    def playblast_options(image_prefix: str, percent: int = 100) -> dict:
         """
-        Execute the Maya playblast command with pre-configured settings.
+        Build the pre-configured Maya playblast settings.
         Args:
-            playblast_path: Full path of the output playblast file.
+            image_prefix: Path prefix of the output image sequence.
+            percent: The playblast resolution in percent of Full HD, below 100 for previews.
+        Returns:
+            The keyword arguments for cm.playblast.
         """
-        cm.playblast(
-            format="qt",
-            filename=playblast_path.replace("\\", "/"),
+        return dict(
+            format="image",
+            filename=image_prefix,
             forceOverwrite=True,
             sequenceTime=False,
-            clearCache=True,
+            clearCache=False,  # Keep Viewport 2.0 caches warm between cameras
+            offScreen=True,
             viewer=False,
             showOrnaments=True,
-            fp=4,
-            percent=100,
-            compression="H.264",
-            quality=100,
+            framePadding=4,
+            percent=percent,
+            compression="png",
+            quality=85 if percent < 100 else 100,
             widthHeight=[1920, 1080]  # Changed to use Full HD for better visuals
         )
 
-    def current_selected(self):
+    @staticmethod
+    def get_image_prefix(image_dir: str, playblast_path: str) -> str:
+        """
+        Get the forward-slashed image sequence prefix for a playblast rendered into a temporary directory.
+        Args:
+            image_dir: The temporary directory holding the frames.
+            playblast_path: Full path of the output playblast file.
+        Returns:
+            The image sequence path prefix.
+        """
+        return pathlib.Path(image_dir, pathlib.Path(playblast_path).stem).as_posix()
+
+    @staticmethod
+    def get_resolution(percent: int) -> tuple:
+        """
+        Get the output size of a playblast.
+        Args:
+            percent: The playblast resolution in percent of Full HD.
+        Returns:
+            A (width, height) tuple.
+        """
+        return 1920 * percent // 100, 1080 * percent // 100
+
+    @staticmethod
+    def get_frame_settings() -> tuple:
+        """
+        Get the playback start frame and the scene frame rate.
+        Returns:
+            A (start_frame, fps) tuple.
+        """
+        import maya.mel as mel
+
+        start_frame = int(cm.playbackOptions(query=True, minTime=True))
+        fps = mel.eval("currentTimeUnitToFPS()")
+        return start_frame, fps
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def get_video_codec() -> tuple:
+        """
+        Pick the ffmpeg H.264 encoder, preferring NVENC on NVIDIA GPUs and falling back to libx264.
+        The result is probed once per session.
+        Returns:
+            The ffmpeg codec arguments.
+        """
+        probe = [FFMPEG, "-hide_banner", "-f", "lavfi", "-i", "nullsrc=s=256x256:d=0.1",
+                 "-c:v", "h264_nvenc", "-f", "null", "-"]
+        try:
+            nvenc = subprocess.run(probe, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+        except OSError:
+            nvenc = False
+
+        return CameraPlayBlast.NVENC_CODEC if nvenc else CameraPlayBlast.X264_CODEC
+
+    @classmethod
+    def encode_movie(cls, image_prefix: str, playblast_path: str, start_frame: int, fps: float) -> None:
+        """
+        Encode a playblast image sequence into an H.264 movie with ffmpeg.
+        An NVENC encode that fails is retried with libx264.
+        Args:
+            image_prefix: Path prefix of the image sequence.
+            playblast_path: Full path of the output playblast file.
+            start_frame: The first frame number of the image sequence.
+            fps: The frame rate of the movie.
+        """
+        def encode(codec: tuple) -> None:
+            command = [
+                FFMPEG, "-y",
+                "-framerate", str(fps),
+                "-start_number", str(start_frame),
+                "-i", f"{image_prefix}.%04d.png",
+                *codec,
+                "-pix_fmt", "yuv420p",
+                playblast_path
+            ]
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+        codec = cls.get_video_codec()
+        try:
+            encode(codec)
+        except subprocess.CalledProcessError:
+            # NVENC can still fail per encode, e.g. past the GPU's concurrent session limit
+            if codec == cls.X264_CODEC:
+                raise
+            encode(cls.X264_CODEC)
+
+    def execute_playblast(self, playblast_path: str, panel: str, percent: int = 100) -> None:
+        """
+        Playblast a model panel to an image sequence and queue it for encoding into a movie.
+        Blocks while the encode queue is full.
+        Args:
+            playblast_path: Full path of the output playblast file.
+            panel: The model panel to playblast from.
+            percent: The playblast resolution in percent of Full HD.
+        """
+        image_dir = tempfile.mkdtemp(prefix="cap_")
+        image_prefix = self.get_image_prefix(image_dir, playblast_path)
+        try:
+            cm.playblast(editorPanelName=panel, **self.playblast_options(image_prefix, percent))
+        except BaseException:
+            shutil.rmtree(image_dir, ignore_errors=True)
+            raise
+        self._encode_q.put((image_dir, image_prefix, playblast_path, *self.get_frame_settings()))
+
+    def stream_playblast(self, playblast_path: str, panel: str, percent: int = 100) -> None:
+        """
+        Render the playback range in a model panel and pipe each frame's raw color buffer into ffmpeg,
+        skipping the intermediate image sequence on disk.
+        Unlike cm.playblast this reads the panel's on-screen buffer, so the panel must stay visible.
+        Args:
+            playblast_path: Full path of the output playblast file.
+            panel: The model panel to read the frames from.
+            percent: The playblast resolution in percent of Full HD.
+        """
+        import ctypes
+        import maya.OpenMayaUI as oMUI
+
+        width, height = self.get_resolution(percent)
+        start_frame, fps = self.get_frame_settings()
+        end_frame = int(cm.playbackOptions(query=True, maxTime=True))
+
+        view = oMUI.M3dView()
+        oMUI.M3dView.getM3dViewFromModelPanel(panel, view)
+        image = oM.MImage()
+
+        # Resampling the buffer would distort the frames, so the editor must match the output exactly
+        port_size = (view.portWidth(), view.portHeight())
+        if port_size != (width, height):
+            raise RuntimeError(
+                f"Playblast panel is {port_size[0]}x{port_size[1]}, expected {width}x{height}. "
+                f"Make sure the output resolution fits on screen."
+            )
+
+        # Maya's color buffer is stored bottom-up, so flip it while encoding
+        command = [
+            FFMPEG, "-y",
+            "-f", "rawvideo",
+            "-pix_fmt", "rgba",
+            "-s", f"{width}x{height}",
+            "-framerate", str(fps),
+            "-i", "-",
+            "-vf", "vflip",
+            *self.get_video_codec(),
+            "-pix_fmt", "yuv420p",
+            playblast_path
+        ]
+        # ffmpeg's log goes to a temporary file, a pipe could fill up and stall the encoder
+        with tempfile.TemporaryFile() as log:
+            process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=log)
+
+            current_time = cm.currentTime(query=True)
+            try:
+                for frame in range(start_frame, end_frame + 1):
+                    cm.currentTime(frame, update=True)
+                    view.refresh(False, True)
+                    view.readColorBuffer(image, True)
+                    try:
+                        process.stdin.write(ctypes.string_at(int(image.pixels()), width * height * 4))
+                    except BrokenPipeError:
+                        break  # ffmpeg exited early, its log below says why
+            finally:
+                try:
+                    process.stdin.close()
+                except BrokenPipeError:
+                    pass
+                process.wait()
+                cm.currentTime(current_time)
+
+            if process.returncode:
+                log.seek(0)
+                raise subprocess.CalledProcessError(process.returncode, command, stderr=log.read())
+
+    def _encode_worker(self) -> None:
+        """
+        Background thread encoding the queued image sequences, one at a time.
+        Failures are collected in the error queue since Maya commands must run on the main thread.
+        """
+        while True:
+            image_dir, image_prefix, playblast_path, start_frame, fps = self._encode_q.get()
+            try:
+                self.encode_movie(image_prefix, playblast_path, start_frame, fps)
+            except Exception as e:  # Nothing above this thread to propagate to, and it must keep draining the queue
+                self._encode_errors.put(f"Failed to encode playblast {playblast_path}: {self.format_error(e)}")
+            finally:
+                shutil.rmtree(image_dir, ignore_errors=True)
+                self._encode_q.task_done()
+
+    def _apply_selection(self):
         """
         Update the Maya selection to match the selected items in the list widget.
+        Called once the selection has settled for the debounce interval.
         """
-        items = self.connection_lwg.selectedItems()
-        selected_items = [item.text() for item in items]
-        cm.select(clear=True)
-        cm.select(selected_items)
+        selected_items = [item.text() for item in self.connection_lwg.selectedItems()]
+        if selected_items:
+            cm.select(selected_items, replace=True)
+        else:
+            cm.select(clear=True)
 
 
 # noinspection PyMethodMayBeStatic,PyAttributeOutsideInit,PyMethodOverriding
@@ -248,6 +823,9 @@ class MainWindow(QtWidgets.QDialog):
         Returns: The Maya main window widget as a Python object
 
         """
+        import maya.OpenMayaUI as oMUI
+        from shiboken2 import wrapInstance
+
         main_window_ptr = oMUI.MQtUtil.mainWindow()
         if sys.version_info.major >= 3:
             return wrapInstance(int(main_window_ptr), QtWidgets.QWidget)
@@ -270,7 +848,7 @@ class MainWindow(QtWidgets.QDialog):
 
     def create_widget(self):
         self.content_layout = QtWidgets.QHBoxLayout()
-        self.content_layout.addWidget(CameraPlayBlast())
+        self._cap = None  # Built on first show
 
         self.close_btn = QtWidgets.QPushButton("Close")
 
@@ -288,6 +866,10 @@ class MainWindow(QtWidgets.QDialog):
     def showEvent(self, e):
         super(MainWindow, self).showEvent(e)
 
+        if self._cap is None:
+            self._cap = CameraPlayBlast()
+            self.content_layout.addWidget(self._cap)
+
         if self.geometry:
             self.restoreGeometry(self.geometry)
 
@@ -16,10 +16,12 @@ def onMayaDroppedPythonFile(obj):
     name =  "Playblast"
     tooltip=  "Auto playblast selected camera"
     imageName  = "camera_icon.png"
-    command = """from CameraAutoPlayblast import CameraPlayblast
-import importlib
-importlib.reload(CameraPlayblast)
-CameraPlayblast.MainWindow().show()
+    command = """import os
+from CameraAutoPlayblast import CameraPlayblast
+if os.environ.get('CAP_DEV'):
+    import importlib
+    importlib.reload(CameraPlayblast)
+CameraPlayblast.MainWindow.display()
     """
     gShelfTopLevel = eval("global string $gShelfTopLevel; $temp = $gShelfTopLevel;")
     currentShelf = cm.tabLayout(gShelfTopLevel, q=True, st=True)